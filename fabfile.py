@@ -7,7 +7,7 @@ root = config.PROJECT_ROOT
 
 def start():
     with cd(root):
-        run("screen -d -m  ../bin/python tweetgtalk/bot.py >tweetgtalk.log 2>&1")
+        run("screen -d -m  ../bin/python tweetgtalk/bot.py >tweetgtalk.out 2>&1")
 
 def stop():
     pids = run("ps aux | grep tweetgtalk/bot.py | grep -v grep | awk '{print $2}'")
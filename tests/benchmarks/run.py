@@ -0,0 +1,223 @@
+'''
+Performance regression checks, using the fakes in tests/fakes.py.
+
+    python -m tests.benchmarks.run --save    # record the baseline
+    python -m tests.benchmarks.run           # compare with it
+
+Exits with an error when a metric is worse than the baseline by more
+than the threshold, when a metric of the baseline is missing, or when
+there is no baseline. Metrics ending in "_per_second" are better higher,
+the ones ending in "_ms" are better lower, any other is only reported.
+
+Timings depend on the machine, so the baseline is not committed. Record
+it on the machine running the checks, and again when a benchmark is
+changed on purpose.
+'''
+import json
+import optparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+from tweetgtalk import twittertext
+from tweetgtalk.index import StatusIndex
+from tweetgtalk.jid import sender
+from sleekxmpp.stanza import Message
+
+from tests.fakes import FakeEnvironment, FakeStatus, FakeTwitterAPI
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def bench_messages(users=50, messages=20, workers=8, latency=0.002):
+    '''
+    Commands from many users through TweetBot, with a slow twitter.
+
+    Every message arrives at once, latency is measured from then to the
+    reply, so it includes the time waiting for a worker, or for the XMPP
+    thread when there are no workers
+    '''
+    jids = [ "user%d@gmail.com" % i for i in range(users) ]
+    api = FakeTwitterAPI.with_timeline(500, latency=latency)
+    env = FakeEnvironment(users=jids, api=api, workers=workers)
+    env.start()
+
+    commands = ["timeline", "older", "search tweet", "tweet hello"]
+    burst = [ (jid + "/res", commands[i % len(commands)])
+              for i in range(messages) for jid in jids ]
+    start = time.time()
+    sent_at = [ (jid, start) for jid, body in burst ]
+    for jid, body in burst:
+        env.send(jid, body)
+    env.wait()
+    total = time.time() - start
+    env.stop()
+
+    # replies to each user come in the order of their messages
+    replies = {}
+    for (to, body), at in zip(env.server.sent, env.server.sent_at):
+        replies.setdefault(to, []).append(at)
+    latencies = []
+    for jid, at in sent_at:
+        latencies.append(replies[jid].pop(0) - at)
+
+    return {
+        'messages_per_second': round(len(sent_at) / total, 1),
+        'message_p50_ms': ms(percentile(latencies, 0.5)),
+        'message_p95_ms': ms(percentile(latencies, 0.95)),
+    }
+
+def bench_messages_inline():
+    '''
+    Same workload as ``bench_messages``, handling messages on the XMPP
+    thread, to compare with the worker pool
+    '''
+    results = bench_messages(workers=0)
+    return dict( ('inline_' + name, value) for name, value in results.items() )
+
+def bench_tweet_length(size=20000):
+    rand = random.Random(0)
+    words = [u"hello", u"world", u"caf\xe9", u"\U0001F600", u"#python",
+             u"@igorsobreira", u"http://example.com/a/long/path?x=1", u"www.foo.com"]
+    corpus = [ u" ".join(rand.choice(words) for i in range(rand.randint(5, 40)))
+               for i in range(size) ]
+
+    start = time.time()
+    for tweet in corpus:
+        twittertext.tweet_length(twittertext.normalize(tweet))
+    return {'tweets_per_second': round(size / (time.time() - start), 1)}
+
+def bench_index(size=100000, queries=1000):
+    rand = random.Random(0)
+    words = [ u"word%d" % i for i in range(5000) ]
+    index = StatusIndex(max_size=size)
+    index.add([ FakeStatus(id, 'user%d' % (id % 100),
+                           u" ".join(rand.sample(words, 10)))
+                for id in xrange(size) ])
+
+    latencies = []
+    for i in range(queries):
+        query = u" ".join(rand.sample(words, rand.randint(1, 2)))
+        start = time.time()
+        index.search(query)
+        latencies.append(time.time() - start)
+    return {
+        'index_query_p50_ms': ms(percentile(latencies, 0.5)),
+        'index_query_p95_ms': ms(percentile(latencies, 0.95)),
+    }
+
+def bench_jid(stanzas=200000, users=1000):
+    '''
+    Simple JID of the sender of message stanzas, with ``sender`` and the
+    way it was done before: ``str(msg.get_from()).split("/", 1)[0]``
+    '''
+    msgs = []
+    for i in range(users):
+        msg = Message()
+        msg['from'] = "user%d@gmail.com/resource%d" % (i, i)
+        msgs.append(msg)
+
+    def parse(func):
+        start = time.time()
+        for i in xrange(stanzas):
+            func(msgs[i % users])
+        return time.time() - start
+
+    split_time = parse(lambda msg: str(msg.get_from()).split("/", 1)[0])
+    jid_time = parse(lambda msg: sender(msg).bare)
+    return {
+        'jids_per_second': round(stanzas / jid_time, 1),
+        'split_jids_per_second': round(stanzas / split_time, 1),
+        'jid_us_saved_each': round((split_time - jid_time) / stanzas * 1e6, 3),
+    }
+
+def bench_startup():
+    '''
+    Import the bot and answer a first message, in a fresh interpreter
+    '''
+    code = ("import time; start = time.time(); "
+            "from tweetgtalk import bot; imported = time.time(); "
+            "from tests.fakes import FakeEnvironment; "
+            "env = FakeEnvironment(users=['igor@igorsobreira.com']); env.start(); "
+            "env.send('igor@igorsobreira.com/Adium', 'timeline'); "
+            "print imported - start, time.time() - start")
+    output = subprocess.check_output([sys.executable, "-c", code])
+    imported, replied = [ float(value) for value in output.split() ]
+    return {'import_ms': ms(imported), 'first_reply_ms': ms(replied)}
+
+BENCHMARKS = (bench_messages, bench_messages_inline, bench_tweet_length,
+              bench_index, bench_jid, bench_startup)
+
+
+def run():
+    results = {}
+    for bench in BENCHMARKS:
+        results.update(bench())
+    return results
+
+def compare(baseline, results, threshold):
+    '''
+    Messages for every metric in ``results`` worse than in ``baseline``
+    by more than ``threshold`` (a fraction), and for every metric in
+    ``baseline`` missing from ``results``
+    '''
+    regressions = [ u"{0}: missing (baseline {1})".format(name, baseline[name])
+                    for name in sorted(baseline) if name not in results ]
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if name.endswith('_per_second'):
+            worse = value < expected * (1 - threshold)
+        elif name.endswith('_ms'):
+            worse = value > expected * (1 + threshold)
+        else:
+            worse = False
+        if worse:
+            regressions.append(u"{0}: {1} (baseline {2})".format(name, value, expected))
+    return regressions
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--save', action='store_true',
+            help='record the results as the new baseline')
+    parser.add_option('--baseline', default=BASELINE)
+    parser.add_option('--threshold', type='float', default=0.25,
+            help='fraction a metric may be worse than the baseline')
+    options, args = parser.parse_args()
+
+    results = run()
+    for name, value in sorted(results.items()):
+        print("{0:30} {1}".format(name, value))
+
+    if options.save:
+        with open(options.baseline, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print("Baseline saved to %s" % options.baseline)
+        return
+
+    if not os.path.exists(options.baseline):
+        print("No baseline at %s, record one with --save" % options.baseline)
+        sys.exit(1)
+
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, results, options.threshold)
+    if regressions:
+        print("\nWorse than baseline:")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+'''
+In-process stand-ins for the services the bot talks to, so tests and
+benchmarks can drive it without a network connection
+'''
+import collections
+import random
+import threading
+import time
+
+from tweepy.error import TweepError
+
+# twitter application used instead of the one in config
+CONSUMER = ("consumer_token", "consumer_secret")
+
+class FakeMessage(dict):
+    '''
+    Incoming chat stanza, as delivered by sleekxmpp to ``on_message``
+    '''
+
+    def __init__(self, jid, body, type='chat'):
+        super(FakeMessage, self).__init__(body=body, type=type, **{'from': jid})
+        # attributes of the stanza element
+        self.xml = {'from': jid}
+
+    def get_from(self):
+        return self['from']
+
+
+class FakePresence(dict):
+    '''
+    Presence stanza, as delivered by sleekxmpp to ``on_presence``
+    '''
+
+    def __init__(self, jid, type):
+        super(FakePresence, self).__init__(type=type, **{'from': jid})
+        self.xml = {'from': jid}
+
+
+class FakeStream(object):
+    '''
+    Records what the bot sends. Can be used as the ``bot`` of a
+    ``MessageHandler``
+    '''
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_message(self, mto, mbody, mhtml=None):
+        with self._lock:
+            self.sent.append((mto, mbody, mhtml))
+
+    def bodies(self, jid):
+        return [ body for (to, body, html) in self.sent if to == jid ]
+
+
+class FakeUser(object):
+
+    def __init__(self, screen_name):
+        self.screen_name = screen_name
+
+
+class FakeStatus(object):
+
+    def __init__(self, id, screen_name, text):
+        self.id = id
+        self.user = FakeUser(screen_name)
+        self.text = text
+
+
+class FakeSearchResult(object):
+
+    def __init__(self, status):
+        self.id = status.id
+        self.from_user = status.user.screen_name
+        self.text = status.text
+
+
+class FakeTwitterAPI(object):
+    '''
+    Scripted twitter API. The home timeline is ``statuses``, newest first,
+    and every call waits ``latency`` seconds.
+
+    :param error_rate: fraction of calls failing with ``TweepError``,
+                       picked by a random generator seeded with ``seed``
+    :param rate_limit: ``(calls, seconds)``, calls over it fail with
+                       ``TweepError`` like twitter's rate limit
+
+    '''
+
+    def __init__(self, statuses=(), latency=0, screen_name='me',
+                 error_rate=0, rate_limit=None, seed=0):
+        self.statuses = list(statuses)
+        self.latency = latency
+        self.screen_name = screen_name
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.calls = []
+        self.direct_messages = []
+        self._random = random.Random(seed)
+        self._window = collections.deque()
+        self._lock = threading.Lock()
+
+    def _call(self, name, **kwargs):
+        with self._lock:
+            self.calls.append((name, kwargs))
+            now = time.time()
+            if self.rate_limit is not None:
+                limit, seconds = self.rate_limit
+                while self._window and self._window[0] <= now - seconds:
+                    self._window.popleft()
+                if len(self._window) >= limit:
+                    raise TweepError(u"Rate limit exceeded")
+                self._window.append(now)
+            failed = self._random.random() < self.error_rate
+        time.sleep(self.latency)
+        if failed:
+            raise TweepError(u"Something is technically wrong")
+
+    def called(self, name):
+        return len([ call for call in self.calls if call[0] == name ])
+
+    @classmethod
+    def with_timeline(cls, size, **kwargs):
+        statuses = [ FakeStatus(id, 'user%d' % (id % 10), 'tweet %d' % id)
+                     for id in range(size, 0, -1) ]
+        return cls(statuses, **kwargs)
+
+    def post(self, screen_name, text):
+        with self._lock:
+            id = self.statuses[0].id + 1 if self.statuses else 1
+            status = FakeStatus(id, screen_name, text)
+            self.statuses.insert(0, status)
+        return status
+
+    def update_status(self, status, in_reply_to_status_id=None):
+        self._call('update_status', status=status,
+                in_reply_to_status_id=in_reply_to_status_id)
+        return self.post(self.screen_name, status)
+
+    def send_direct_message(self, screen_name, text):
+        self._call('send_direct_message', screen_name=screen_name, text=text)
+        self.direct_messages.append((screen_name, text))
+
+    def home_timeline(self, since_id=None, max_id=None, count=20, page=1):
+        self._call('home_timeline', since_id=since_id, max_id=max_id,
+                count=count, page=page)
+        result = [ status for status in self.statuses
+                   if (since_id is None or status.id > since_id)
+                   and (max_id is None or status.id <= max_id) ]
+        start = (int(page) - 1) * count
+        return result[start:start + count]
+
+    def me(self):
+        self._call('me')
+        return FakeUser(self.screen_name)
+
+    def mentions(self, count=20):
+        self._call('mentions', count=count)
+        mention = '@' + self.screen_name
+        return [ status for status in self.statuses
+                 if mention in status.text ][:count]
+
+    def search(self, q):
+        self._call('search', q=q)
+        words = q.lower().split()
+        return [ FakeSearchResult(status) for status in self.statuses
+                 if all(word in status.text.lower() for word in words) ]
+
+
+class FakeXMPPServer(object):
+    '''
+    Scripted XMPP server, for bots built by ``bot()``.
+
+    Each entry of ``sessions`` is one connection attempt: None refuses
+    it, a list of ``(jid, body)`` is delivered to the bot and then the
+    connection is dropped. A ``DROP`` in the list drops it earlier and the
+    rest is delivered as if the bot was still busy with it when offline
+    '''
+
+    DROP = object()
+
+    def __init__(self, sessions):
+        self.sessions = list(sessions)
+        self.sent = []
+        self.sent_at = []
+        self.connections = 0
+        self.current = None
+
+    def accept(self):
+        if not self.sessions:
+            return False
+        self.current = self.sessions.pop(0)
+        if self.current is None:
+            return False
+        self.connections += 1
+        return True
+
+    def bot(self, **kwargs):
+        from tweetgtalk.bot import TweetBot
+        server = self
+
+        class FakeServerBot(TweetBot):
+
+            def connect(self, address=(), reattempt=True):
+                return server.accept()
+
+            def process(self, threaded=True):
+                self.on_start(None)
+                online = True
+                for event in server.current:
+                    if event is server.DROP:
+                        online = False
+                        self.on_disconnect(None)
+                    else:
+                        self.on_message(FakeMessage(*event))
+                if self.workers:
+                    self.workers.join()
+                if online:
+                    self.on_disconnect(None)
+
+            def sendPresence(self, *args, **kwargs):
+                pass
+
+            def send_message(self, mto, mbody, mhtml=None):
+                server.sent.append((mto, mbody))
+                server.sent_at.append(time.time())
+
+        return FakeServerBot("bot@gmail.com", "secret", **kwargs)
+
+
+class FakeUserStore(object):
+    '''
+    In memory stand-in for the ``User`` model, to be given to
+    ``TwitterManager(user_model=...)``
+    '''
+
+    TOKEN = "oauth_token_secret=secret&oauth_token=token"
+
+    class DoesNotExist(Exception):
+        pass
+
+    def __init__(self):
+        self.users = {}
+        self.lookups = 0
+        self.objects = self
+
+    def __call__(self, jid, token=None):
+        return FakeUserRecord(self, jid, token)
+
+    def get(self, jid):
+        self.lookups += 1
+        try:
+            return self.users[jid]
+        except KeyError:
+            raise self.DoesNotExist(jid)
+
+    def add(self, jid, token=TOKEN):
+        self(jid, token).save()
+
+
+class FakeUserRecord(object):
+
+    def __init__(self, store, jid, token=None):
+        self.store = store
+        self.jid = jid
+        self.token = token
+
+    def save(self):
+        self.store.users[self.jid] = self
+
+
+class FakeEnvironment(object):
+    '''
+    A ``TweetBot`` wired to a fake XMPP server, a fake twitter API and
+    a fake user store, where ``users`` (simple JIDs) already authorized
+    the bot. Messages go through the same path as in production:
+    ``TweetBot.on_message``, ``MessageHandler``, ``TwitterCommands``
+    '''
+
+    def __init__(self, users=(), api=None, workers=0):
+        from tweetgtalk.bot import MessageHandler, TwitterManager
+
+        self.api = api or FakeTwitterAPI.with_timeline(200)
+        self.store = FakeUserStore()
+        for jid in users:
+            self.store.add(jid)
+
+        self.server = FakeXMPPServer([[]])
+        self.server.accept()
+        handler = MessageHandler()
+        handler.manager = TwitterManager(user_model=self.store,
+                api_factory=lambda auth: self.api, consumer=CONSUMER)
+        self.bot = self.server.bot(message_handler=handler, workers=workers)
+
+    def start(self):
+        self.bot.on_start(None)
+        if self.bot.workers:
+            self.bot.workers.start()
+
+    def stop(self):
+        if self.bot.workers:
+            self.bot.workers.stop()
+
+    def send(self, jid, body):
+        self.bot.on_message(FakeMessage(jid, body))
+
+    def wait(self):
+        '''
+        Block until every message sent was handled
+        '''
+        if self.bot.workers:
+            self.bot.workers.join()
+
+    def replies(self, jid):
+        return [ body for (to, body) in self.server.sent if to == jid ]
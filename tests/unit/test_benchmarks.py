@@ -0,0 +1,35 @@
+import unittest
+
+from tests.benchmarks.run import compare, percentile
+
+class CompareTestCase(unittest.TestCase):
+
+    def test_throughput_regression(self):
+        baseline = {'messages_per_second': 100}
+
+        assert [] == compare(baseline, {'messages_per_second': 80}, 0.25)
+        assert 1 == len(compare(baseline, {'messages_per_second': 70}, 0.25))
+
+    def test_latency_regression(self):
+        baseline = {'message_p95_ms': 10}
+
+        assert [] == compare(baseline, {'message_p95_ms': 12}, 0.25)
+        assert 1 == len(compare(baseline, {'message_p95_ms': 13}, 0.25))
+
+    def test_other_metrics_are_only_reported(self):
+        assert [] == compare({'jid_us_saved_each': 10}, {'jid_us_saved_each': 1}, 0.25)
+
+    def test_missing_metrics_fail(self):
+        baseline = {'message_p95_ms': 10, 'jids_per_second': 100}
+
+        assert [u"jids_per_second: missing (baseline 100)"] == \
+                compare(baseline, {'message_p95_ms': 10}, 0.25)
+
+    def test_new_metrics_are_ignored(self):
+        assert [] == compare({}, {'message_p95_ms': 13}, 0.25)
+
+    def test_percentile(self):
+        values = range(100)
+
+        assert 50 == percentile(values, 0.5)
+        assert 99 == percentile(values, 1)
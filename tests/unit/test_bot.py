@@ -4,30 +4,40 @@ from tweepy.error import TweepError
 
 from tweetgtalk.bot import TwitterManager, TwitterAccount, MessageHandler, \
         TwitterCommands
+from tests.fakes import CONSUMER
 
 class TwitterManagerTestCase(unittest.TestCase):
     
     def test_get_or_create_account_returns_account_if_not_exist(self):
-        manager = TwitterManager()
+        manager = TwitterManager(consumer=CONSUMER)
         account = manager.get_or_create_account("igor@igorsobreira.com/Adium123")
 
         assert isinstance(account, TwitterAccount)
 
     def test_get_or_create_account_doesnt_create_duplicate_account(self):
-        manager = TwitterManager()
+        manager = TwitterManager(consumer=CONSUMER)
         account1 = manager.get_or_create_account("igor@igorsobreira.com/Adium123")
         account2 = manager.get_or_create_account("igor@igorsobreira.com/Adium123")
         
         assert account1 == account2
         assert 1 == len(manager.accounts)
 
+    def test_get_or_create_account_shares_account_between_resources(self):
+        manager = TwitterManager(consumer=CONSUMER)
+        account1 = manager.get_or_create_account("igor@igorsobreira.com/Adium123")
+        account2 = manager.get_or_create_account("igor@igorsobreira.com/Psi456")
+        
+        assert account1 == account2
+        assert "igor@igorsobreira.com/Psi456" == account2.jid
+        assert 1 == len(manager.accounts)
+
     def test_get_account_returns_none_if_no_account_found(self):
-        manager = TwitterManager()
+        manager = TwitterManager(consumer=CONSUMER)
         
         assert None == manager.get_account("igor@igorsobreira.com/Aduim123")
     
     def test_get_account_returns_account(self):
-        manager = TwitterManager()
+        manager = TwitterManager(consumer=CONSUMER)
         account = manager.get_or_create_account("igor@igorsobreira.com/Adium123")
 
         assert account == manager.get_account("igor@igorsobreira.com/Adium123")
@@ -44,7 +54,7 @@ class TwitterAccountTestCase(mocker.MockerTestCase):
         
         self.mocker.replay()
 
-        account = TwitterAccount('igor@igorsobreira.com/Admium123')
+        account = TwitterAccount('igor@igorsobreira.com/Admium123', consumer=CONSUMER)
 
         self.mocker.verify()
         assert False == account.authenticating
@@ -61,7 +71,7 @@ class TwitterAccountTestCase(mocker.MockerTestCase):
 
         self.mocker.replay()
         
-        account = TwitterAccount("igor@igorsobreira.com/Adium123")
+        account = TwitterAccount("igor@igorsobreira.com/Adium123", consumer=CONSUMER)
         redirect_url = account.authenticate()
         
         self.mocker.verify()
@@ -82,7 +92,7 @@ class TwitterAccountTestCase(mocker.MockerTestCase):
         
         self.mocker.replay()
 
-        account = TwitterAccount("igor@igorsobreira.com/Adium123")
+        account = TwitterAccount("igor@igorsobreira.com/Adium123", consumer=CONSUMER)
         verified = account.verify("code")
 
         self.mocker.verify()
@@ -102,7 +112,7 @@ class TwitterAccountTestCase(mocker.MockerTestCase):
 
         self.mocker.replay()
 
-        account = TwitterAccount("igor@igorsobreira.com/Adium123")
+        account = TwitterAccount("igor@igorsobreira.com/Adium123", consumer=CONSUMER)
         verified = account.verify("code")
 
         self.mocker.verify()
@@ -279,6 +289,10 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         self.mocker.result("igor@igorsobreira.com/Adium123")
         account.api
         self.mocker.result("api")
+        account.timeline
+        self.mocker.result("timeline")
+        account.index
+        self.mocker.result("index")
         
         send_message = self.mocker.mock()
         send_message("igor@igorsobreira.com/Adium123", "Command not found")
@@ -288,7 +302,7 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         handler = MessageHandler()
         handler.send_message = send_message
 
-        handler.execute_command(account, "foobar")
+        assert "not_found" == handler.execute_command(account, "foobar")
 
         self.mocker.verify()
 
@@ -298,6 +312,10 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         self.mocker.result("igor@igorsobreira.com/Adium123")
         account.api
         self.mocker.result("api")
+        account.timeline
+        self.mocker.result("timeline")
+        account.index
+        self.mocker.result("index")
         
         send_message = self.mocker.mock()
         send_message("igor@igorsobreira.com/Adium123", "@foo: bar",
@@ -307,13 +325,15 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         home_timeline()
         self.mocker.result( 
                 ("@foo: bar", u'<a href="http://twitter.com/foo">@foo</a>: bar'))
+        home_timeline.__name__
+        self.mocker.result("home_timeline")
 
         commands = self.mocker.mock()
         commands.resolve("timeline")
         self.mocker.result((home_timeline, {}))
 
         commands_class = self.mocker.mock()
-        commands_class("api")
+        commands_class("api", "timeline", "index")
         self.mocker.result(commands)
 
         self.mocker.replay()
@@ -322,7 +342,7 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         handler.send_message = send_message
         handler.commands_class = commands_class
 
-        handler.execute_command(account, "timeline")
+        assert "home_timeline" == handler.execute_command(account, "timeline")
 
         self.mocker.verify()
 
@@ -332,6 +352,10 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         self.mocker.result("igor@igorsobreira.com/Adium123")
         account.api
         self.mocker.result("api")
+        account.timeline
+        self.mocker.result("timeline")
+        account.index
+        self.mocker.result("index")
         
         send_message = self.mocker.mock()
         send_message("igor@igorsobreira.com/Adium123", "Tweet sent")
@@ -339,13 +363,15 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         update_status = self.mocker.mock()
         update_status(tweet="this is an example tweet")
         self.mocker.result("Tweet sent")
+        update_status.__name__
+        self.mocker.result("update_status")
         
         commands = self.mocker.mock()
         commands.resolve("tweet this is an example tweet")
         self.mocker.result((update_status, {"tweet": "this is an example tweet"}))
 
         commands_class = self.mocker.mock()
-        commands_class("api")
+        commands_class("api", "timeline", "index")
         self.mocker.result(commands)
 
         self.mocker.replay()
@@ -354,7 +380,8 @@ class MessageHandlerTestCase(mocker.MockerTestCase):
         handler.send_message = send_message
         handler.commands_class = commands_class
 
-        handler.execute_command(account, "tweet this is an example tweet")
+        assert "update_status" == handler.execute_command(account,
+                "tweet this is an example tweet")
 
         self.mocker.verify()
         
@@ -385,6 +412,12 @@ class TwitterCommandsResolverTestCase(unittest.TestCase):
         
         assert (commands.update_status, {'tweet': 'this is a tweet'}) == result
     
+    def test_resolve_thread_comamnd(self):
+        commands = TwitterCommands("api")
+        result = commands.resolve(u"thread this is a long tweet")
+        
+        assert (commands.update_status_thread, {'tweet': 'this is a long tweet'}) == result
+
     def test_resolve_direct_message_command(self):
         commands = TwitterCommands("api")
         result = commands.resolve(u"dm @igorsobreira hello")
@@ -496,6 +529,42 @@ class TwitterCommandsTestCase(mocker.MockerTestCase):
         self.mocker.verify()
         assert u"Tweet too long, 141 characters. Must be up to 140." == result
     
+    def test_tweet_command_counts_urls_as_shortened(self):
+        tweet = u"o" * 100 + u" http://example.com/" + u"a" * 100
+
+        api = self.mocker.mock()
+        api.update_status(tweet)
+        
+        self.mocker.replay()
+
+        commands = TwitterCommands(api)
+        result = commands.update_status(tweet)
+        
+        self.mocker.verify()
+        assert u"Tweet sent" == result
+
+    def test_thread_command(self):
+        status1 = self.mocker.mock()
+        status1.id
+        self.mocker.result(1)
+        status2 = self.mocker.mock()
+        status2.id
+        self.mocker.result(2)
+
+        api = self.mocker.mock()
+        api.update_status(mocker.ANY, in_reply_to_status_id=None)
+        self.mocker.result(status1)
+        api.update_status(mocker.ANY, in_reply_to_status_id=1)
+        self.mocker.result(status2)
+
+        self.mocker.replay()
+
+        commands = TwitterCommands(api)
+        result = commands.update_status_thread(u"o " * 100)
+
+        self.mocker.verify()
+        assert u"Thread sent, 2 tweets" == result
+
     def test_direct_message_command(self):
         api = self.mocker.mock()
         api.send_direct_message(screen_name="igorsobreira", text="hello")
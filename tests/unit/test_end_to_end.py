@@ -0,0 +1,77 @@
+import unittest
+
+from tests.fakes import FakeEnvironment, FakeTwitterAPI
+
+IGOR = "igor@igorsobreira.com/Adium123"
+
+class EndToEndTestCase(unittest.TestCase):
+
+    def environment(self, **kwargs):
+        env = FakeEnvironment(users=["igor@igorsobreira.com"], **kwargs)
+        env.start()
+        self.addCleanup(env.stop)
+        return env
+
+    def test_timeline_older_and_search(self):
+        env = self.environment()
+        env.send(IGOR, "timeline")
+        env.send(IGOR, "older")
+        env.send(IGOR, "search tweet 170")
+
+        replies = env.replies(IGOR)
+        assert 3 == len(replies)
+        assert replies[0].startswith(u"@user0: tweet 200")
+        assert replies[1].startswith(u"@user0: tweet 180")
+        assert u"@user0: tweet 170" == replies[2]
+        assert 0 == env.api.called('search')
+
+    def test_tweet(self):
+        env = self.environment()
+        env.send(IGOR, "tweet hello world")
+
+        assert [u"Tweet sent"] == env.replies(IGOR)
+        assert u"hello world" == env.api.statuses[0].text
+
+    def test_many_users_with_workers(self):
+        users = [ "user%d@gmail.com" % i for i in range(20) ]
+        env = FakeEnvironment(users=users, workers=4)
+        env.start()
+        for i in range(5):
+            for jid in users:
+                env.send(jid + "/res", "tweet %s %d" % (jid, i))
+        env.wait()
+        env.stop()
+
+        for jid in users:
+            assert [u"Tweet sent"] * 5 == env.replies(jid + "/res")
+
+    def test_rate_limit_errors(self):
+        api = FakeTwitterAPI.with_timeline(10, rate_limit=(2, 60))
+        env = self.environment(api=api)
+        env.send(IGOR, "dm @igorsobreira one")
+        env.send(IGOR, "dm @igorsobreira two")
+        env.send(IGOR, "dm @igorsobreira three")
+
+        assert [u"Message sent", u"Message sent", u"Rate limit exceeded"] == \
+                env.replies(IGOR)
+
+    def test_error_rate_is_deterministic(self):
+        def failures(seed):
+            api = FakeTwitterAPI(error_rate=0.5, seed=seed)
+            result = []
+            for i in range(20):
+                try:
+                    api.me()
+                    result.append(False)
+                except Exception:
+                    result.append(True)
+            return result
+
+        assert failures(1) == failures(1)
+        assert 0 < sum(failures(1)) < 20
+
+    def test_blank_message(self):
+        env = self.environment()
+        env.send(IGOR, "   ")
+
+        assert [u"Command not found"] == env.replies(IGOR)
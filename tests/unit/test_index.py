@@ -0,0 +1,117 @@
+import unittest
+
+from tweetgtalk.bot import TwitterCommands
+from tweetgtalk.index import QUERY_TERM_RE, StatusIndex, terms
+from tests.fakes import FakeStatus, FakeTwitterAPI
+
+class TermsTestCase(unittest.TestCase):
+
+    def test_lowercase_words(self):
+        assert set([u"hello", u"world"]) == terms(u"Hello, World!")
+
+    def test_mentions_and_hashtags(self):
+        assert set([u"@igor", u"igor", u"#python", u"python"]) == \
+                terms(u"@igor #python")
+
+    def test_author(self):
+        assert set([u"from:igor"]) == terms(u"from:Igor", QUERY_TERM_RE)
+
+    def test_author_not_in_text(self):
+        assert set([u"from", u"igor"]) == terms(u"from:Igor")
+
+
+class StatusIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = StatusIndex(max_size=3)
+        self.index.add([
+            FakeStatus(3, 'igor', u'Python is cool'),
+            FakeStatus(2, 'somebody', u'@me what about python?'),
+            FakeStatus(1, 'other', u'Just a tweet'),
+        ])
+
+    def ids(self, status_list):
+        return [ status.id for status in status_list ]
+
+    def test_search_every_term_newest_first(self):
+        assert [3, 2] == self.ids(self.index.search(u"python"))
+        assert [2] == self.ids(self.index.search(u"python about"))
+        assert [] == self.index.search(u"python java")
+
+    def test_search_author(self):
+        assert [3] == self.ids(self.index.search(u"from:igor"))
+        assert [] == self.index.search(u"@igor")
+
+    def test_search_author_ignores_text(self):
+        self.index.add([FakeStatus(4, 'alice', u'quoting from:bob')])
+
+        assert [] == self.index.search(u"from:bob")
+        assert [4] == self.ids(self.index.search(u"from:alice"))
+
+    def test_mentions(self):
+        self.index.screen_name = 'me'
+
+        assert [2] == self.ids(self.index.mentions())
+
+    def test_own_tweets_dont_hide_mentions(self):
+        index = StatusIndex()
+        index.screen_name = 'me'
+        index.add([FakeStatus(1, 'somebody', u'@me hello')])
+        index.add([ FakeStatus(id, 'me', u'@me talking to myself')
+                    for id in range(2, 30) ])
+
+        assert [1] == self.ids(index.mentions())
+
+    def test_status_added_once(self):
+        self.index.add([FakeStatus(3, 'igor', u'Python is cool')])
+
+        assert 3 == len(self.index)
+
+    def test_evicts_first_indexed(self):
+        self.index.add([FakeStatus(4, 'igor', u'new tweet')])
+
+        assert 3 == len(self.index)
+        assert [] == self.index.search(u"python cool")
+        assert "cool" not in self.index.terms
+        assert [4] == self.ids(self.index.search(u"new"))
+
+
+class SearchCommandsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeTwitterAPI([
+            FakeStatus(2, 'somebody', u'@me python tips'),
+            FakeStatus(1, 'igor', u'Python is cool'),
+        ])
+        self.commands = TwitterCommands(self.api, index=StatusIndex())
+
+    def test_resolve(self):
+        assert (self.commands.mentions, {}) == self.commands.resolve(u"mentions")
+        assert (self.commands.search, {'terms': u'python cool'}) == \
+                self.commands.resolve(u"search python cool")
+
+    def test_search_served_from_index(self):
+        self.commands.home_timeline()
+        text, html = self.commands.search(u"cool")
+
+        assert u"@igor: Python is cool" == text
+        assert 0 == self.api.called('search')
+
+    def test_search_falls_back_to_api(self):
+        text, html = self.commands.search(u"cool")
+
+        assert u"@igor: Python is cool" == text
+        assert 1 == self.api.called('search')
+
+    def test_mentions_served_from_index(self):
+        self.commands.home_timeline()
+        text, html = self.commands.mentions()
+
+        assert u"@somebody: @me python tips" == text
+        assert 0 == self.api.called('mentions')
+
+    def test_mentions_falls_back_to_api(self):
+        text, html = self.commands.mentions()
+
+        assert u"@somebody: @me python tips" == text
+        assert 1 == self.api.called('mentions')
@@ -0,0 +1,45 @@
+import unittest
+
+from sleekxmpp.stanza import Message
+
+from tweetgtalk.jid import JID, sender
+
+class JIDTestCase(unittest.TestCase):
+
+    def test_full_jid(self):
+        jid = JID("igor@igorsobreira.com/Adium123")
+
+        assert u"igor@igorsobreira.com" == jid.bare
+        assert u"Adium123" == jid.resource
+        assert "igor@igorsobreira.com/Adium123" == jid
+
+    def test_bare_jid(self):
+        jid = JID("igor@igorsobreira.com")
+
+        assert jid is jid.bare
+        assert None == jid.resource
+
+    def test_interned(self):
+        jid = JID("igor@igorsobreira.com/Adium123")
+
+        assert jid is JID("igor@igorsobreira.com/Adium123")
+        assert jid is JID(jid)
+        assert jid.bare is JID("igor@igorsobreira.com/Psi456").bare
+
+    def test_hashes_like_string(self):
+        accounts = {"igor@igorsobreira.com": 1}
+
+        assert 1 == accounts[JID("igor@igorsobreira.com/Adium123").bare]
+
+    def test_from_object(self):
+        class SleekJID(object):
+            def __str__(self):
+                return "igor@igorsobreira.com/Adium123"
+
+        assert u"igor@igorsobreira.com" == JID(SleekJID()).bare
+
+    def test_sender_of_stanza(self):
+        msg = Message()
+        msg['from'] = "igor@igorsobreira.com/Adium123"
+
+        assert sender(msg) is JID("igor@igorsobreira.com/Adium123")
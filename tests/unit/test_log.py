@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import Queue
+import shutil
+import tempfile
+import unittest
+
+from tweepy.error import TweepError
+
+from tweetgtalk import log
+from tweetgtalk.jid import JID
+from tests.fakes import FakeEnvironment, FakeTwitterAPI
+
+class LogTestCase(unittest.TestCase):
+
+    def record(self, msg, level=logging.INFO, **fields):
+        record = logging.LogRecord('tweetgtalk', level, __file__, 1, msg, (), None)
+        record.fields = fields
+        return record
+
+
+class JidHashTestCase(unittest.TestCase):
+
+    def test_same_hash_for_any_resource(self):
+        assert log.jid_hash(JID("igor@igorsobreira.com/Adium123").bare) == \
+                log.jid_hash(JID("igor@igorsobreira.com/Psi456").bare)
+
+    def test_doesnt_contain_jid(self):
+        assert "igor" not in log.jid_hash("igor@igorsobreira.com")
+
+
+class JSONFormatterTestCase(LogTestCase):
+
+    def test_one_line_with_fields(self):
+        record = self.record(u"Message handled", event='message', outcome='command')
+        line = log.JSONFormatter().format(record)
+
+        data = json.loads(line)
+        assert "\n" not in line
+        assert u"Message handled" == data['message']
+        assert u"message" == data['event']
+        assert u"command" == data['outcome']
+
+
+class SampleFilterTestCase(LogTestCase):
+
+    def test_drops_sampled_events(self):
+        sample = log.SampleFilter({'message': 0.0})
+
+        assert not sample.filter(self.record(u"msg", event='message'))
+        assert sample.filter(self.record(u"msg", event='other'))
+        assert sample.filter(self.record(u"msg"))
+
+    def test_keeps_warnings(self):
+        sample = log.SampleFilter({'message': 0.0})
+
+        assert sample.filter(self.record(u"msg", level=logging.ERROR, event='message'))
+
+
+class QueueHandlerTestCase(LogTestCase):
+
+    def test_drops_records_when_queue_is_full(self):
+        handler = log.QueueHandler(Queue.Queue(1))
+        handler.emit(self.record(u"first"))
+        handler.emit(self.record(u"second"))
+
+        assert 1 == handler.dropped
+        assert u"first" == handler.queue.get().msg
+
+
+class QueueListenerTestCase(LogTestCase):
+
+    def test_reports_dropped_records_on_stop(self):
+        written = []
+        writer = logging.Handler()
+        writer.emit = written.append
+        handler = log.QueueHandler(Queue.Queue(1))
+        handler.emit(self.record(u"first"))
+        handler.emit(self.record(u"second"))
+
+        listener = log.QueueListener(handler.queue, writer, source=handler)
+        listener.start()
+        listener.stop()
+
+        assert [u"first", u"1 log records dropped, the queue was full"] == \
+                [ record.getMessage() for record in written ]
+        assert 1 == written[-1].fields['dropped']
+
+
+class SetupTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'tweetgtalk.log')
+        self.handlers = logging.getLogger().handlers[:]
+        self.level = logging.getLogger().level
+
+    def tearDown(self):
+        logging.getLogger().handlers = self.handlers
+        logging.getLogger().setLevel(self.level)
+        shutil.rmtree(self.dir)
+
+    def test_records_written_by_background_thread(self):
+        listener = log.setup(self.filename)
+        logging.getLogger('tweetgtalk').info(u"Hello %s", u"world",
+                extra={'fields': {'event': 'message'}})
+        listener.stop()
+
+        lines = open(self.filename).readlines()
+        assert 1 == len(lines)
+        assert u"Hello world" == json.loads(lines[0])['message']
+
+    def test_rotates_by_size(self):
+        listener = log.setup(self.filename, max_bytes=500, backup_count=2)
+        for i in range(50):
+            logging.getLogger('tweetgtalk').info(u"record %d", i)
+        listener.stop()
+
+        assert os.path.exists(self.filename + '.1')
+        assert os.path.getsize(self.filename) <= 500
+
+
+class MessageRecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.records = []
+        self.handler = logging.Handler()
+        self.handler.emit = self.records.append
+        self.logger = logging.getLogger('tweetgtalk')
+        self.logger.addHandler(self.handler)
+        self.level = self.logger.level
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_one_record_per_message(self):
+        env = FakeEnvironment(users=["igor@igorsobreira.com"])
+        env.start()
+        env.send("igor@igorsobreira.com/Adium123", "timeline")
+
+        fields = self.message_fields()
+        assert log.jid_hash("igor@igorsobreira.com") == fields['jid']
+        assert "home_timeline" == fields['command']
+        assert "command" == fields['outcome']
+        assert set(['account', 'command', 'total']) == set(fields['timings'])
+
+    def test_command_not_found(self):
+        env = FakeEnvironment(users=["igor@igorsobreira.com"])
+        env.start()
+        env.send("igor@igorsobreira.com/Adium123", "Timeline")
+
+        fields = self.message_fields()
+        assert "not_found" == fields['command']
+        assert "not_found" == fields['outcome']
+
+    def test_command_failure_records_exception(self):
+        env = FakeEnvironment(users=["igor@igorsobreira.com"],
+                              api=FakeTwitterAPI(error_rate=1.0))
+        env.start()
+        self.assertRaises(TweepError, env.send,
+                          "igor@igorsobreira.com/Adium123", "timeline")
+
+        fields = self.message_fields()
+        assert None == fields['command']
+        assert "error" == fields['outcome']
+        assert "TweepError" == fields['exception']
+
+    def message_fields(self):
+        messages = [ record for record in self.records
+                     if getattr(record, 'fields', {}).get('event') == 'message' ]
+        assert 1 == len(messages)
+        return messages[0].fields
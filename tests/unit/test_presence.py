@@ -0,0 +1,141 @@
+import unittest
+
+from tweetgtalk.bot import TweetBot, TwitterManager
+from tweetgtalk.jid import JID
+from tweetgtalk.presence import PresenceTracker
+from tweetgtalk.workers import WorkerPool
+from tests.fakes import CONSUMER, FakePresence, FakeTwitterAPI
+
+IGOR = JID("igor@igorsobreira.com/Adium123")
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+class PresenceTrackerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.presence = PresenceTracker(release_after=60, clock=self.clock)
+        self.done = []
+
+    def test_unknown_users_are_active(self):
+        self.presence.defer(IGOR, 'job', self.done.append, 1)
+
+        assert self.presence.is_active(IGOR)
+        assert [1] == self.done
+
+    def test_work_waits_while_away(self):
+        self.presence.update(IGOR, 'away')
+        self.presence.defer(IGOR, 'job', self.done.append, 1)
+
+        assert not self.presence.is_active(IGOR)
+        assert [] == self.done
+
+    def test_only_last_job_of_each_kind_runs_on_return(self):
+        self.presence.update(IGOR, 'unavailable')
+        self.presence.defer(IGOR, 'job', self.done.append, 1)
+        self.presence.defer(IGOR, 'job', self.done.append, 2)
+        self.presence.defer(IGOR, 'other', self.done.append, 3)
+        self.presence.update(JID("igor@igorsobreira.com/Psi456"), 'available')
+
+        assert [2, 3] == sorted(self.done)
+        assert {} == self.presence.pending
+
+    def test_away_only_when_no_resource_is_available(self):
+        psi = JID("igor@igorsobreira.com/Psi456")
+        self.presence.update(IGOR, 'available')
+        self.presence.update(psi, 'available')
+        self.presence.update(psi, 'unavailable')
+
+        assert self.presence.is_active(IGOR)
+
+        self.presence.update(psi, 'available')
+        self.presence.update(IGOR, 'away')
+
+        assert self.presence.is_active(IGOR)
+
+        self.presence.update(psi, 'xa')
+
+        assert not self.presence.is_active(IGOR)
+
+        self.presence.update(psi, 'unavailable')
+        self.presence.update(IGOR, 'unavailable')
+
+        assert not self.presence.is_active(IGOR)
+        assert {} == self.presence.resources
+
+    def test_idle_after_release_time(self):
+        self.presence.update(IGOR, 'xa')
+        self.clock.now += 30
+        self.presence.update(IGOR, 'unavailable')
+
+        assert [] == self.presence.idle()
+        self.clock.now += 31
+        assert [u"igor@igorsobreira.com"] == self.presence.idle()
+
+
+class TwitterManagerPresenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.manager = TwitterManager(PresenceTracker(release_after=60, clock=self.clock),
+                consumer=CONSUMER)
+        self.api = FakeTwitterAPI.with_timeline(100)
+        self.manager.workers = WorkerPool(1)
+        self.manager.workers.start()
+
+    def tearDown(self):
+        self.manager.workers.stop()
+
+    def test_prefetch_paused_while_away(self):
+        account = self.manager.get_or_create_account(IGOR)
+        self.manager.update_presence(IGOR, 'away')
+        account.timeline.older(self.api)
+        account.timeline.older(self.api)
+
+        assert 2 == self.api.called('home_timeline')
+
+        self.manager.update_presence(IGOR, 'available')
+        self.manager.workers.join()
+
+        assert 3 == self.api.called('home_timeline')
+        assert 60 == self.api.calls[-1][1]['max_id']
+
+    def test_release_idle_accounts(self):
+        self.manager.get_or_create_account(IGOR)
+        self.manager.update_presence(IGOR, 'unavailable')
+        self.clock.now += 61
+        self.manager.release_idle()
+
+        assert None == self.manager.get_account(IGOR)
+        assert self.manager.presence.is_active(IGOR)
+
+    def test_keeps_accounts_authenticating(self):
+        account = self.manager.get_or_create_account(IGOR)
+        account.authenticating = True
+        self.manager.update_presence(IGOR, 'unavailable')
+        self.clock.now += 61
+        self.manager.release_idle()
+
+        assert account == self.manager.get_account(IGOR)
+
+
+class TweetBotPresenceTestCase(unittest.TestCase):
+
+    def test_presence_tracked_for_every_resource(self):
+        bot = TweetBot("bot@gmail.com", "secret")
+        bot.on_presence(FakePresence("igor@igorsobreira.com/Adium123", 'available'))
+        bot.on_presence(FakePresence("igor@igorsobreira.com/Psi456", 'unavailable'))
+
+        presence = bot.message_handler.manager.presence
+        assert presence.is_active(JID("igor@igorsobreira.com/Psi456"))
+
+        bot.on_presence(FakePresence("igor@igorsobreira.com/Adium123", 'unavailable'))
+
+        assert not presence.is_active(JID("igor@igorsobreira.com/Psi456"))
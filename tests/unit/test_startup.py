@@ -0,0 +1,32 @@
+import subprocess
+import sys
+import unittest
+
+from tweetgtalk import db
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_importing_bot_doesnt_import_db_or_twitter_libraries(self):
+        code = ("import sys; from tweetgtalk import bot; "
+                "print [ m for m in ('mongoengine', 'tweepy', 'config') if m in sys.modules ]")
+        output = subprocess.check_output([sys.executable, "-c", code])
+
+        assert "[]" == output.strip()
+
+
+class GetConnectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connect = db.connect
+        self.calls = []
+        db.connect = lambda: self.calls.append(1) or "connection"
+        db._connection = None
+
+    def tearDown(self):
+        db.connect = self.connect
+        db._connection = None
+
+    def test_connects_once(self):
+        assert "connection" == db.get_connection()
+        assert "connection" == db.get_connection()
+        assert 1 == len(self.calls)
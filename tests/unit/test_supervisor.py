@@ -0,0 +1,120 @@
+import os
+import signal
+import socket
+import threading
+import unittest
+
+from tweetgtalk.bot import MessageHandler, TweetBot
+from tweetgtalk.supervisor import Supervisor
+from tests.fakes import FakeXMPPServer
+
+class SupervisorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.delays = []
+        self.message_handler = MessageHandler()
+        self.message_handler.handle = self.echo
+        self.bots = []
+
+    def echo(self, msg, jid):
+        self.message_handler.send_message(msg.get_from(), msg['body'])
+
+    def supervisor(self, server, **kwargs):
+        def create_bot():
+            bot = server.bot(message_handler=self.message_handler, **kwargs)
+            self.bots.append(bot)
+            return bot
+        return Supervisor(create_bot, ("talk.google.com", 5222),
+                sleep=self.delays.append, max_attempts=3)
+
+    def test_delay_grows_exponentially_with_jitter(self):
+        supervisor = Supervisor(None, None, min_delay=1, max_delay=10)
+
+        for failures, delay in [(1, 1), (2, 2), (3, 4), (4, 8), (5, 10), (9, 10)]:
+            for i in range(20):
+                assert delay / 2.0 <= supervisor.delay(failures) <= delay
+
+    def test_retries_refused_connections(self):
+        server = FakeXMPPServer([None, None, [("igor@igorsobreira.com/Adium", "hi")]])
+        self.supervisor(server).run()
+
+        assert [("igor@igorsobreira.com/Adium", "hi")] == server.sent
+        assert 1 == server.connections
+        # two refused, then three more failures after the session was dropped
+        assert 4 == len(self.delays)
+        assert self.delays[1] > self.delays[0] / 2.0
+
+    def test_gives_up_after_max_attempts(self):
+        server = FakeXMPPServer([None] * 10)
+        self.supervisor(server).run()
+
+        assert 0 == server.connections
+        assert 2 == len(self.delays)
+
+    def test_reconnects_after_dropped_session(self):
+        server = FakeXMPPServer([
+            [("igor@igorsobreira.com/Adium", "first")],
+            [("igor@igorsobreira.com/Adium", "second")],
+        ])
+        self.supervisor(server).run()
+
+        assert 2 == server.connections
+        assert ["first", "second"] == [ body for (to, body) in server.sent ]
+        assert self.bots[0].message_handler is self.bots[1].message_handler
+
+    def test_replies_sent_while_offline_are_replayed(self):
+        server = FakeXMPPServer([
+            [("igor@igorsobreira.com/Adium", "before"), FakeXMPPServer.DROP,
+             ("igor@igorsobreira.com/Adium", "while offline")],
+            [],
+        ])
+        self.supervisor(server, workers=2).run()
+
+        assert ["before", "while offline"] == [ body for (to, body) in server.sent ]
+        assert 2 == server.connections
+        assert 0 == len(self.message_handler.outbox)
+
+    def test_stops_on_signals(self):
+        handlers = dict( (signum, signal.getsignal(signum))
+                         for signum in (signal.SIGTERM, signal.SIGHUP) )
+        server = FakeXMPPServer([[]])
+        supervisor = self.supervisor(server)
+        supervisor.bot = server.bot(message_handler=self.message_handler)
+        disconnected = []
+        supervisor.bot.disconnect = lambda: disconnected.append(True)
+        try:
+            supervisor.stop_on_signals()
+            os.kill(os.getpid(), signal.SIGTERM)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        assert supervisor.stopped
+        assert [True] == disconnected
+
+    def test_sleekxmpp_returns_when_the_stream_drops(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+
+        def drop():
+            connection, address = listener.accept()
+            connection.recv(1024)
+            connection.close()
+        threading.Thread(target=drop).start()
+
+        bots = []
+        def create_bot():
+            bots.append(TweetBot("bot@localhost", "secret"))
+            return bots[-1]
+        supervisor = Supervisor(create_bot, listener.getsockname(),
+                sleep=self.delays.append, max_attempts=1)
+        thread = threading.Thread(target=supervisor.run)
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+        listener.close()
+
+        assert not thread.is_alive()
+        assert 1 == len(bots)
+        assert not bots[0].auto_reconnect
@@ -0,0 +1,169 @@
+import time
+import unittest
+
+from tweetgtalk.bot import TwitterCommands
+from tweetgtalk.timeline import TimelineCursor
+from tweetgtalk.workers import WorkerPool
+from tests.fakes import FakeTwitterAPI
+
+class TimelineCursorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeTwitterAPI.with_timeline(100)
+        self.workers = WorkerPool(1)
+        self.workers.start()
+        self.cursor = TimelineCursor(count=20, defer=self.defer)
+
+    def tearDown(self):
+        self.workers.stop()
+
+    def defer(self, key, func, *args):
+        self.workers.submit("igor@igorsobreira.com", func, *args)
+
+    def ids(self, status_list):
+        return [ status.id for status in status_list ]
+
+    def test_older_pages_back_by_id(self):
+        assert range(100, 80, -1) == self.ids(self.cursor.older(self.api))
+        assert range(80, 60, -1) == self.ids(self.cursor.older(self.api))
+        assert range(60, 40, -1) == self.ids(self.cursor.older(self.api))
+
+    def test_new_tweets_dont_repeat_older_pages(self):
+        self.cursor.older(self.api)
+        for i in range(5):
+            self.api.post('somebody', 'new tweet')
+
+        assert range(80, 60, -1) == self.ids(self.cursor.older(self.api))
+
+    def test_newer_returns_only_unseen_tweets(self):
+        self.cursor.older(self.api)
+        self.api.post('somebody', 'new tweet')
+        self.api.post('somebody', 'another new tweet')
+
+        assert [102, 101] == self.ids(self.cursor.newer(self.api))
+        assert [] == self.cursor.newer(self.api)
+
+    def test_newer_doesnt_skip_when_more_than_count_arrived(self):
+        self.cursor.older(self.api)
+        for i in range(30):
+            self.api.post('somebody', 'new tweet')
+
+        assert range(120, 100, -1) == self.ids(self.cursor.newer(self.api))
+        assert 10 == self.cursor.pending
+        assert range(130, 120, -1) == self.ids(self.cursor.newer(self.api))
+        assert 0 == self.cursor.pending
+        assert [] == self.cursor.newer(self.api)
+
+    def test_newer_doesnt_stop_on_short_pages(self):
+        self.cursor.older(self.api)
+        for i in range(30):
+            self.api.post('somebody', 'new tweet')
+        home_timeline = self.api.home_timeline
+        # a deleted status missing from every page
+        self.api.home_timeline = lambda **kwargs: home_timeline(**kwargs)[:-1]
+
+        assert range(121, 101, -1) == self.ids(self.cursor.newer(self.api))
+        assert range(130, 121, -1) == self.ids(self.cursor.newer(self.api))
+        assert [] == self.cursor.newer(self.api)
+
+    def test_newer_fetches_at_most_max_pages(self):
+        self.cursor.MAX_PAGES = 2
+        self.cursor.older(self.api)
+        for i in range(70):
+            self.api.post('somebody', 'new tweet')
+
+        assert range(150, 130, -1) == self.ids(self.cursor.newer(self.api))
+        assert 2 == len([ kwargs for name, kwargs in self.api.calls
+                          if kwargs.get('since_id') ])
+        assert self.cursor.truncated
+
+        assert range(170, 150, -1) == self.ids(self.cursor.newer(self.api))
+        assert range(120, 100, -1) == self.ids(self.cursor.newer(self.api))
+        assert range(130, 120, -1) == self.ids(self.cursor.newer(self.api))
+        assert not self.cursor.truncated
+        assert [] == self.cursor.newer(self.api)
+        self.api.post('somebody', 'new tweet')
+        assert [171] == self.ids(self.cursor.newer(self.api))
+
+    def test_older_served_from_prefetch(self):
+        self.api.latency = 0.05
+        self.cursor.older(self.api)
+        self.workers.join()
+
+        start = time.time()
+        status_list = self.cursor.older(self.api)
+        elapsed = time.time() - start
+
+        assert range(80, 60, -1) == self.ids(status_list)
+        assert elapsed < self.api.latency
+
+    def test_prefetch_failure_falls_back_to_api(self):
+        jobs = []
+        cursor = TimelineCursor(count=20,
+                defer=lambda key, func, *args: jobs.append((func, args)))
+        cursor.older(self.api)
+        self.api.error_rate = 1
+        for func, args in jobs:
+            func(*args)
+        self.api.error_rate = 0
+
+        assert range(80, 60, -1) == self.ids(cursor.older(self.api))
+
+    def test_nothing_prefetched_without_defer(self):
+        cursor = TimelineCursor(count=20)
+        cursor.older(self.api)
+
+        assert 1 == self.api.called('home_timeline')
+
+    def test_end_of_timeline(self):
+        for i in range(5):
+            self.cursor.older(self.api)
+
+        assert [] == self.cursor.older(self.api)
+
+
+class TimelineCommandsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeTwitterAPI.with_timeline(30)
+        self.cursor = TimelineCursor(count=20)
+        self.commands = TwitterCommands(self.api, self.cursor)
+
+    def test_resolve_older_and_more(self):
+        assert (self.commands.older_timeline, {}) == self.commands.resolve(u"older")
+        assert (self.commands.newer_timeline, {}) == self.commands.resolve(u"more")
+
+    def test_older_continues_after_timeline(self):
+        self.commands.home_timeline()
+        text, html = self.commands.older_timeline()
+
+        assert text.startswith(u"@user0: tweet 10")
+        assert u"No older tweets" == self.commands.older_timeline()
+
+    def test_more_tells_how_many_are_pending(self):
+        self.commands.home_timeline()
+        for i in range(25):
+            self.api.post('somebody', 'new tweet')
+        text, html = self.commands.newer_timeline()
+
+        assert text.endswith(u'5 more new tweets, send "more"')
+
+    def test_more_tells_when_more_were_not_fetched(self):
+        self.cursor.MAX_PAGES = 1
+        self.commands.home_timeline()
+        for i in range(25):
+            self.api.post('somebody', 'new tweet')
+        text, html = self.commands.newer_timeline()
+
+        assert text.endswith(u'More new tweets, send "more"')
+
+    def test_more_without_new_tweets(self):
+        self.commands.home_timeline()
+
+        assert u"No new tweets" == self.commands.newer_timeline()
+
+    def test_commands_not_found_without_cursor(self):
+        commands = TwitterCommands(self.api)
+
+        assert u"Command not found" == commands.older_timeline()
+        assert u"Command not found" == commands.newer_timeline()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+
+from tweetgtalk.twittertext import normalize, tweet_length, split_tweet, \
+        MAX_LENGTH, SHORT_URL_LENGTH
+
+class TweetLengthTestCase(unittest.TestCase):
+
+    def test_plain_text(self):
+        assert 11 == tweet_length(u"hello world")
+
+    def test_url_counts_as_short_url(self):
+        url = u"http://example.com/" + u"a" * 100
+        assert 6 + SHORT_URL_LENGTH == tweet_length(u"look: " + url)
+
+    def test_trailing_punctuation_is_not_part_of_url(self):
+        assert SHORT_URL_LENGTH + 1 == tweet_length(u"www.example.com.")
+
+    def test_long_punctuation_run_is_linear(self):
+        started = time.time()
+        assert SHORT_URL_LENGTH == tweet_length(u"http://a" + u"." * 16000 + u"b")
+        assert SHORT_URL_LENGTH + 16000 == tweet_length(u"http://a" + u"." * 16000)
+        assert time.time() - started < 0.5
+
+    def test_astral_character_counts_as_one(self):
+        assert 1 == tweet_length(u"\U0001F600")
+
+    def test_normalize_composes_characters(self):
+        text = normalize(u"café")
+        assert 4 == tweet_length(text)
+
+    def test_normalize_decodes_byte_strings(self):
+        assert u"ol\xe1" == normalize("ol\xc3\xa1 ")
+
+
+class SplitTweetTestCase(unittest.TestCase):
+
+    def test_short_text_is_not_split(self):
+        assert [u"hello"] == split_tweet(u"hello")
+
+    def test_long_text_split_on_words(self):
+        words = [ u"word%d" % i for i in range(40) ]
+        parts = split_tweet(u" ".join(words))
+
+        assert 2 == len(parts)
+        assert parts[0].endswith(u" 1/2")
+        assert parts[1].endswith(u" 2/2")
+        for part in parts:
+            assert tweet_length(part) <= MAX_LENGTH
+
+        joined = u" ".join(part.rsplit(u" ", 1)[0] for part in parts)
+        assert u" ".join(words) == joined
+
+    def test_long_word_is_cut(self):
+        parts = split_tweet(u"a" * 300)
+
+        assert 3 == len(parts)
+        for part in parts:
+            assert tweet_length(part) <= MAX_LENGTH
+
+    def test_link_inside_long_word_is_not_cut(self):
+        url = u"http://example.com/" + u"a" * 100
+        text = u"(" + u"b" * 120 + url + u")"
+        parts = split_tweet(text)
+
+        assert any( url in part for part in parts )
+        for part in parts:
+            assert tweet_length(part) <= MAX_LENGTH
@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+
+from tweetgtalk.bot import TweetBot
+from tweetgtalk.jid import JID
+from tweetgtalk.workers import WorkerPool
+from tests.fakes import FakeMessage
+
+class WorkerPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(4)
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_runs_every_submitted_job(self):
+        done = []
+        for i in range(100):
+            self.pool.submit(i, done.append, i)
+        self.pool.join()
+
+        assert range(100) == sorted(done)
+
+    def test_jobs_with_same_key_run_in_order(self):
+        done = []
+        for i in range(50):
+            self.pool.submit("igor@igorsobreira.com", done.append, i)
+        self.pool.join()
+
+        assert range(50) == done
+
+    def test_jobs_with_different_keys_run_concurrently(self):
+        running = []
+        lock = threading.Lock()
+        def job():
+            with lock:
+                running.append(threading.current_thread())
+            time.sleep(0.05)
+
+        start = time.time()
+        for i in range(4):
+            self.pool.submit(i, job)
+        self.pool.join()
+
+        assert 4 == len(set(running))
+        assert time.time() - start < 0.15
+
+    def test_failing_job_doesnt_stop_worker(self):
+        done = []
+        self.pool.submit("key", lambda: 1 / 0)
+        self.pool.submit("key", done.append, "after")
+        self.pool.join()
+
+        assert ["after"] == done
+
+
+class TweetBotDispatchTestCase(unittest.TestCase):
+
+    def test_message_handled_inline_without_workers(self):
+        bot = TweetBot("bot@gmail.com", "secret")
+        handled = []
+        bot.message_handler.handle = lambda msg, jid: handled.append((msg, jid))
+
+        msg = FakeMessage("igor@igorsobreira.com/Adium123", "timeline")
+        bot.on_message(msg)
+
+        assert [(msg, "igor@igorsobreira.com/Adium123")] == handled
+        assert isinstance(handled[0][1], JID)
+
+    def test_message_handled_by_workers(self):
+        bot = TweetBot("bot@gmail.com", "secret", workers=2)
+        handled = []
+        bot.message_handler.handle = lambda msg, jid: handled.append((msg, jid))
+        bot.workers.start()
+
+        msgs = [ FakeMessage("igor@igorsobreira.com/Adium123", "tweet %d" % i)
+                 for i in range(10) ]
+        for msg in msgs:
+            bot.on_message(msg)
+        bot.workers.join()
+        bot.workers.stop()
+
+        assert msgs == [ msg for msg, jid in handled ]
+
+    def test_ignores_empty_and_non_chat_messages(self):
+        bot = TweetBot("bot@gmail.com", "secret")
+        handled = []
+        bot.message_handler.handle = lambda msg, jid: handled.append((msg, jid))
+
+        bot.on_message(FakeMessage("igor@igorsobreira.com/Adium123", ""))
+        bot.on_message(FakeMessage("igor@igorsobreira.com/Adium123", "hi", type='error'))
+
+        assert [] == handled
@@ -1,71 +1,190 @@
 #!/usr/bin/env python
+import collections
+import functools
+import logging
 import re
-import tweepy
+import threading
+import time
 import sleekxmpp
 from sleekxmpp.xmlstream import ET
 
-import config
 import db
-from models import User
+import log
+import twittertext
+from jid import JID, sender
+from index import StatusIndex
+from presence import PresenceTracker
+from supervisor import Supervisor
+from timeline import TimelineCursor
+from workers import WorkerPool
+
+logger = logging.getLogger('tweetgtalk')
+
+def elapsed(started):
+    return round((time.time() - started) * 1000, 2)
+
+def get_user_model():
+    '''
+    Import mongoengine and connect to MongoDB only when an account is
+    first saved or loaded, not when the bot starts
+    '''
+    db.get_connection()
+    from models import User
+    return User
 
 class TweetBot(sleekxmpp.ClientXMPP):
     '''
     Handle XMPP logic
+
+    :param workers: number of threads handling messages. With 0 messages
+                    are handled on the XMPP event thread, one at a time
+    :param message_handler: reuse the ``MessageHandler`` of a previous
+                            connection, keeping its accounts and replies
+                            not sent yet
+
     '''
 
-    def __init__(self, jid, password):
+    RELEASE_INTERVAL = 600
+
+    def __init__(self, jid, password, workers=0, message_handler=None):
         super(TweetBot, self).__init__(jid, password)
         self.add_event_handler("session_start", self.on_start)
         self.add_event_handler("message", self.on_message)
+        self.add_event_handler("disconnected", self.on_disconnect)
+        self.add_event_handler("killed", self.on_killed)
+        self.add_event_handler("changed_status", self.on_presence)
+
+        # reconnecting is up to the Supervisor
+        self.auto_reconnect = False
+        self.session_started = False
+        self.killed = False
         
-        self.message_handler = MessageHandler(bot=self)
+        self.message_handler = message_handler or MessageHandler()
+        self.message_handler.bot = self
+        self.message_handler.set_online(False)
+        self.workers = WorkerPool(workers) if workers else None
+        self.message_handler.manager.workers = self.workers
+
+    def run(self):
+        '''
+        Process the stream until disconnected
+        '''
+        if self.workers:
+            self.workers.start()
+        try:
+            self.process(threaded=False)
+        finally:
+            if self.workers:
+                self.workers.stop()
 
     def on_start(self, event):
         self.sendPresence()
+        self.session_started = True
+        self.message_handler.set_online(True)
+        self.schedule("release idle accounts", self.RELEASE_INTERVAL,
+                self.message_handler.manager.release_idle, repeat=True)
+
+    def on_disconnect(self, event):
+        self.message_handler.set_online(False)
+
+    def on_killed(self, event):
+        self.killed = True
+
+    def on_presence(self, presence):
+        self.message_handler.manager.update_presence(
+                sender(presence), presence['type'])
 
     def on_message(self, msg):
         if msg['type'] == 'chat' and msg['body']:
-            self.message_handler.handle(msg)
+            jid = sender(msg)
+            if self.workers:
+                self.workers.submit(jid.bare, self.message_handler.handle, msg, jid)
+            else:
+                self.message_handler.handle(msg, jid)
 
 
 class MessageHandler(object):
     '''
-    Handle incomming messages routing to commands or authentication
+    Handle incomming messages routing to commands or authentication.
+
+    Replies sent while the bot is offline are kept in ``outbox`` and sent
+    when it is back online
     '''
 
+    OUTBOX_SIZE = 1000
+
     def __init__(self, bot=None):
         self.bot = bot
         self.manager = TwitterManager()
         self.commands_class = TwitterCommands
+        self.online = True
+        self.outbox = collections.deque(maxlen=self.OUTBOX_SIZE)
+        self._outbox_lock = threading.Lock()
+
+    def set_online(self, online):
+        with self._outbox_lock:
+            self.online = online
+            while online and self.outbox:
+                jid, text, html = self.outbox.popleft()
+                self.bot.send_message(mto=jid, mbody=text, mhtml=html)
 
-    def handle(self, msg):
+    def handle(self, msg, jid=None):
+        '''
+        Reply to ``msg``. ``jid`` is its sender, when already parsed
+        '''
+        started = time.time()
         body = msg['body'].strip()
-        jid = str(msg.get_from())
-
-        account = self.manager.get_or_create_account(jid)
-        if account.verified or account.reload_authentication():
-            self.execute_command(account, body)
-        else: 
-            if account.authenticating:
-                if account.verify(body):
-                    self.send_message(jid, 'Authentication complete!')
-                    account.save()
+        jid = jid or JID(msg.get_from())
+
+        timings = {}
+        fields = {'event': 'message', 'jid': log.jid_hash(jid.bare),
+                  'command': None, 'outcome': 'error', 'timings': timings}
+        try:
+            account = self.manager.get_or_create_account(jid)
+            if account.verified or account.reload_authentication():
+                timings['account'] = elapsed(started)
+                command_started = time.time()
+                fields['command'] = self.execute_command(account, body)
+                timings['command'] = elapsed(command_started)
+                if fields['command'] == 'not_found':
+                    fields['outcome'] = 'not_found'
                 else:
-                    self.send_message(jid, 'Invalid verification code')
-            else:
-                redirect_url = account.authenticate()
-                self.send_message(jid, u'Enter the url bellow and click "Allow"')
-                self.send_message(jid, redirect_url)
-                self.send_message(jid, u'Enter de verification code:')
+                    fields['outcome'] = 'command'
+            else: 
+                if account.authenticating:
+                    if account.verify(body):
+                        self.send_message(jid, 'Authentication complete!')
+                        account.save()
+                        fields['outcome'] = 'verified'
+                    else:
+                        self.send_message(jid, 'Invalid verification code')
+                        fields['outcome'] = 'not_verified'
+                else:
+                    redirect_url = account.authenticate()
+                    self.send_message(jid, u'Enter the url bellow and click "Allow"')
+                    self.send_message(jid, redirect_url)
+                    self.send_message(jid, u'Enter de verification code:')
+                    fields['outcome'] = 'authenticating'
+        except Exception, e:
+            fields['exception'] = e.__class__.__name__
+            raise
+        finally:
+            timings['total'] = elapsed(started)
+            logger.info(u"Message handled", extra={'fields': fields})
     
     def execute_command(self, account, message):
-        commands = self.commands_class(account.api)
+        '''
+        Run the command in ``message`` and reply with its result.
+        Returns the name of the command, "not_found" when there is none
+        '''
+        commands = self.commands_class(account.api, account.timeline, account.index)
         command, kwargs = commands.resolve(message)
         result = command(**kwargs)
         if isinstance(result, (list,tuple)):
             self.send_message(account.jid, *result)
         else:
             self.send_message(account.jid, result)
+        return command.__name__
     
     def send_message(self, jid, text, html=None):
         if html is not None:
@@ -77,48 +196,115 @@ class MessageHandler(object):
                 html = ET.XML(html_block % html)
             except SyntaxError:
                 html = None
+        with self._outbox_lock:
+            if not self.online:
+                self.outbox.append((jid, text, html))
+                return
         self.bot.send_message(mto=jid, mbody=text, mhtml=html)
 
 
 class TwitterManager(object):
     '''
-    Manage the twitter accounts
+    Manage the twitter accounts, one for each simple JID. The account
+    answers to the last resource the user wrote from.
+
+    Background work of an account runs on the ``workers`` of the bot,
+    only while the user is around, see ``PresenceTracker``
+
+    :param user_model: where accounts are persisted, the ``User`` model by default
+    :param api_factory: builds the twitter API from an auth handler,
+                        ``tweepy.API`` by default
+    :param consumer: (token, secret) of the twitter application, read
+                     from config by default
+
     '''
 
-    def __init__(self):
+    def __init__(self, presence=None, user_model=None, api_factory=None,
+                 consumer=None):
         self.accounts = {}
+        self.presence = presence or PresenceTracker()
+        self.user_model = user_model
+        self.api_factory = api_factory
+        self.consumer = consumer
+        self.workers = None
     
     def get_account(self, jid):
         try:
-            return self.accounts[jid]
+            return self.accounts[JID(jid).bare]
         except KeyError:
             return None
 
     def get_or_create_account(self, jid):
+        jid = JID(jid)
         account = self.get_account(jid)
         if not account:
-            account = TwitterAccount(jid)
-            self.accounts[jid] = account
+            account = TwitterAccount(jid,
+                    defer=functools.partial(self.defer, jid.bare),
+                    user_model=self.user_model, api_factory=self.api_factory,
+                    consumer=self.consumer)
+            self.accounts[jid.bare] = account
+        else:
+            account.jid = jid
         return account
 
+    def defer(self, jid, key, func, *args):
+        '''
+        Run ``func`` for ``jid`` on the worker pool, waiting while the user
+        is away. Dropped when the bot has no workers
+        '''
+        if self.workers is not None:
+            self.presence.defer(jid, key, self._submit, jid, func, *args)
+
+    def _submit(self, jid, func, *args):
+        # the pool of the current connection, not of the one deferring
+        if self.workers is not None:
+            self.workers.submit(jid.bare, func, *args)
+
+    def update_presence(self, jid, show):
+        self.presence.update(JID(jid), show)
+        if not self.presence.is_active(JID(jid)):
+            account = self.get_account(jid)
+            if account is not None:
+                account.timeline.release()
+
+    def release_idle(self):
+        '''
+        Drop the accounts of users offline for long. They are loaded from
+        the database again when the user comes back
+        '''
+        for jid in self.presence.idle():
+            account = self.accounts.get(jid)
+            if account is not None and account.authenticating:
+                continue
+            self.accounts.pop(jid, None)
+            self.presence.forget(jid)
+
 
 class TwitterAccount(object):
     '''
     Handles a twitter account for an user (JID) and control the authentication
     '''
-    def __init__(self, jid):
-        self.jid = jid
+    def __init__(self, jid, defer=None, user_model=None, api_factory=None,
+                 consumer=None):
+        import tweepy
+        if consumer is None:
+            import config
+            consumer = (config.TWEET_APP_CONSUMER_TOKEN,
+                        config.TWEET_APP_CONSUMER_SECRET)
+        self.jid = JID(jid)
+        self.user_model = user_model
+        self.api_factory = api_factory
         self.verified = False
         self.authenticating = False
         self.api = None
+        self.timeline = TimelineCursor(defer=defer)
+        self.index = StatusIndex()
         self._token = None
-        self._auth = tweepy.OAuthHandler(
-                config.TWEET_APP_CONSUMER_TOKEN,
-                config.TWEET_APP_CONSUMER_SECRET)
+        self._auth = tweepy.OAuthHandler(*consumer)
     
     @property
     def simple_jid(self):
-        return str(self.jid).split("/", 1)[0]
+        return self.jid.bare
 
     def authenticate(self):
         url = self._auth.get_authorization_url()
@@ -126,18 +312,20 @@ class TwitterAccount(object):
         return url
     
     def verify(self, code):
+        import tweepy
         try:
             self._token = self._auth.get_access_token(code)
         except tweepy.error.TweepError:
             self.verified = False
             self.authenticating = True
             return False
-        self.api = tweepy.API(self._auth)
+        self.api = (self.api_factory or tweepy.API)(self._auth)
         self.authenticating = False
         self.verified = True
         return True
     
     def save(self):
+        User = self.user_model or get_user_model()
         try:
             user = User.objects.get(jid=self.simple_jid)
         except User.DoesNotExist:
@@ -146,29 +334,42 @@ class TwitterAccount(object):
         user.save()
     
     def reload_authentication(self):
+        import tweepy
+        User = self.user_model or get_user_model()
         try:
             user = User.objects.get(jid=self.simple_jid)
         except User.DoesNotExist:
             return False
         self._token = tweepy.oauth.OAuthToken.from_string(user.token)
         self._auth.set_access_token(self._token.key, self._token.secret)
-        self.api = tweepy.API(self._auth)
+        self.api = (self.api_factory or tweepy.API)(self._auth)
         return True
 
 class TwitterCommands(object):
     '''
     Calls commands on API object and returns already formated to answer the user
+
+    :param timeline: user's ``TimelineCursor``, needed by "older" and "more"
+    :param index: user's ``StatusIndex``, searched before asking twitter
+
     '''
 
-    def __init__(self, api):
+    def __init__(self, api, timeline=None, index=None):
         self.api = api
+        self.timeline = timeline
+        self.index = index
     
     @property
     def patterns(self):
         patterns = (
             (r'^timeline$', self.home_timeline),
             (r'^timeline (?P<page>\d+)$', self.home_timeline),
+            (r'^older$', self.older_timeline),
+            (r'^more$', self.newer_timeline),
+            (r'^mentions$', self.mentions),
+            (r'^search (?P<terms>.+)$', self.search),
             (r'^tweet (?P<tweet>.*)$', self.update_status),
+            (r'^thread (?P<tweet>.*)$', self.update_status_thread),
             (r'^dm @(?P<screen_name>[\w_-]+) (?P<text>.*)$', self.send_direct_message),
         )
         return [ (re.compile(regex), func) for regex, func in patterns ]
@@ -186,31 +387,111 @@ class TwitterCommands(object):
 
     def home_timeline(self, page=1):
         status_list = self.api.home_timeline(page=page)
+        if self.timeline is not None:
+            self.timeline.seen(self.api, status_list)
+        self._add_to_index(status_list)
+        return self._format_timeline(status_list)
+
+    def older_timeline(self):
+        if self.timeline is None:
+            return self.not_found()
+        status_list = self.timeline.older(self.api)
+        if not status_list:
+            return u"No older tweets"
+        self._add_to_index(status_list)
+        return self._format_timeline(status_list)
+
+    def newer_timeline(self):
+        if self.timeline is None:
+            return self.not_found()
+        status_list = self.timeline.newer(self.api)
+        if not status_list:
+            return u"No new tweets"
+        self._add_to_index(status_list)
+        text, html = self._format_timeline(status_list)
+        if self.timeline.truncated:
+            note = u'More new tweets, send "more"'
+        elif self.timeline.pending:
+            note = u'{0} more new tweets, send "more"'.format(self.timeline.pending)
+        else:
+            note = None
+        if note:
+            text, html = text + u"\n\n" + note, html + u"<br/><br/>" + note
+        return text, html
+
+    def mentions(self):
+        if self.index is None:
+            return self.not_found()
+        if self.index.screen_name is None:
+            self.index.screen_name = self.api.me().screen_name
+
+        status_list = self.index.mentions()
+        if not status_list:
+            status_list = self.api.mentions()
+            self._add_to_index(status_list)
+        if not status_list:
+            return u"No mentions"
+        return self._format_timeline(status_list)
+
+    def search(self, terms):
+        if self.index is not None:
+            status_list = self.index.search(terms)
+            if status_list:
+                return self._format_timeline(status_list)
+
+        results = self.api.search(q=terms)
+        if not results:
+            return u"Nothing found"
+        return self._format([ (result.from_user, result.text) for result in results ])
+
+    def _add_to_index(self, status_list):
+        if self.index is not None:
+            self.index.add(status_list)
+
+    def _format_timeline(self, status_list):
+        return self._format([ (status.user.screen_name, status.text)
+                              for status in status_list ])
+
+    def _format(self, tweets):
         result_text = []
         result_html = []
         html = u'<a href="http://twitter.com/{user}">@{user}</a>: {msg}'
 
-        for status in status_list:
-            user = status.user.screen_name
-            text = status.text
+        for user, text in tweets:
             result_text.append(u'@{0}: {1}'.format(user, text))
             result_html.append(html.format(user=user, msg=text))
          
         return u"\n\n".join(result_text), u"<br/><br/>".join(result_html)
     
     def update_status(self, tweet):
-        tweet = tweet.strip()
+        tweet = twittertext.normalize(tweet)
         
         if not tweet:
             return u"Empty tweet"
         
-        if len(tweet) > 140:
-            return u"Tweet too long, {0} characters. Must be up to 140.".format(len(tweet))
+        length = twittertext.tweet_length(tweet)
+        if length > twittertext.MAX_LENGTH:
+            return u"Tweet too long, {0} characters. Must be up to {1}.".format(
+                    length, twittertext.MAX_LENGTH)
         self.api.update_status(tweet)
 
         return u"Tweet sent"
 
+    def update_status_thread(self, tweet):
+        parts = twittertext.split_tweet(tweet)
+
+        if not parts[0]:
+            return u"Empty tweet"
+
+        reply_to = None
+        for part in parts:
+            status = self.api.update_status(part, in_reply_to_status_id=reply_to)
+            reply_to = status.id
+
+        return u"Thread sent, {0} tweets".format(len(parts))
+
     def send_direct_message(self, screen_name, text):
+        import tweepy
         try:
             self.api.send_direct_message(screen_name=screen_name, text=text)
         except tweepy.error.TweepError, e:
@@ -220,24 +501,33 @@ class TwitterCommands(object):
 
 
 def main():
-    db.connect()
-    print("Connected to MongoDB")
+    import config
 
-    bot = TweetBot(config.BOT_JID, config.BOT_PASSWORD)
-    
-    bot.registerPlugin('xep_0030')
-    bot.registerPlugin('xep_0004')
-    bot.registerPlugin('xep_0060')
-    bot.registerPlugin('xep_0199')
-    
-    print("Creating bot")
-    
-    if bot.connect((config.BOT_HOST, config.BOT_PORT)):
-        print("OK")
-        bot.process(threaded=False)
-        print("\nDone")
-    else:
-        print("Not connected")
+    listener = log.setup(getattr(config, 'LOG_FILE', 'tweetgtalk.log'),
+            max_bytes=getattr(config, 'LOG_MAX_BYTES', 10*1024*1024),
+            backup_count=getattr(config, 'LOG_BACKUP_COUNT', 5),
+            sampling=getattr(config, 'LOG_SAMPLING', None))
+
+    message_handler = MessageHandler()
+
+    def create_bot():
+        logger.info(u"Creating bot")
+        bot = TweetBot(config.BOT_JID, config.BOT_PASSWORD,
+                workers=getattr(config, 'BOT_WORKERS', 0),
+                message_handler=message_handler)
+        for plugin in getattr(config, 'BOT_PLUGINS', ('xep_0030', 'xep_0199')):
+            bot.registerPlugin(plugin)
+        return bot
+
+    supervisor = Supervisor(create_bot, (config.BOT_HOST, config.BOT_PORT),
+            max_delay=getattr(config, 'RECONNECT_MAX_DELAY', 300))
+    # stop cleanly so the log is flushed
+    supervisor.stop_on_signals()
+    try:
+        supervisor.run()
+        logger.info(u"Done")
+    finally:
+        listener.stop()
 
 
 
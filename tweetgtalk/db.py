@@ -1,9 +1,19 @@
-import mongoengine
-import config
+_connection = None
 
 def connect():
+    import mongoengine
+    import config
     return mongoengine.connect(
             config.DB_NAME,
             username=config.DB_USERNAME,
             password=config.DB_PASSWORD
         )
+
+def get_connection():
+    '''
+    Connect on first use and reuse the connection after that
+    '''
+    global _connection
+    if _connection is None:
+        _connection = connect()
+    return _connection
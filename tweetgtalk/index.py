@@ -0,0 +1,90 @@
+import collections
+import re
+import threading
+
+# words of a status, "from:" is only indexed for its author
+TERM_RE = re.compile(r'[@#]?\w+', re.UNICODE)
+
+QUERY_TERM_RE = re.compile(r'(?:from:|[@#])?\w+', re.UNICODE)
+
+def terms(text, pattern=TERM_RE):
+    '''
+    Lowercase words of ``text``. "@user" and "#tag" are also found as
+    "user" and "tag". With ``QUERY_TERM_RE`` "from:user" is found as is
+    '''
+    result = set()
+    for term in pattern.findall(text.lower()):
+        result.add(term)
+        if term[0] in u'@#':
+            result.add(term[1:])
+    return result
+
+
+class StatusIndex(object):
+    '''
+    Inverted index over the statuses an user has already fetched, so
+    searching them doesn't need twitter.
+
+    Statuses are added as they are fetched. When there are more than
+    ``max_size`` the ones indexed first are evicted.
+
+    '''
+
+    def __init__(self, max_size=2000):
+        self.max_size = max_size
+        self.screen_name = None
+        self.statuses = collections.OrderedDict()
+        self.terms = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def add(self, status_list):
+        with self._lock:
+            for status in status_list:
+                if status.id in self.statuses:
+                    continue
+                self.statuses[status.id] = status
+                for term in self._status_terms(status):
+                    self.terms.setdefault(term, set()).add(status.id)
+
+            while len(self.statuses) > self.max_size:
+                self._evict()
+
+    def search(self, text, limit=20):
+        '''
+        Statuses with every term in ``text``, newest first. The author is
+        searched as "from:user". With ``limit`` None all are returned
+        '''
+        query = terms(text, QUERY_TERM_RE)
+        if not query:
+            return []
+        with self._lock:
+            matches = [ self.terms.get(term, set()) for term in query ]
+            ids = set.intersection(*matches)
+            ids = sorted(ids, reverse=True)[:limit]
+            return [ self.statuses[id] for id in ids ]
+
+    def mentions(self, limit=20):
+        if self.screen_name is None:
+            return []
+        name = self.screen_name.lower()
+        return [ status for status in self.search(u'@' + name, None)
+                 if status.user.screen_name.lower() != name ][:limit]
+
+    def clear(self):
+        with self._lock:
+            self.statuses.clear()
+            self.terms.clear()
+
+    def _evict(self):
+        id, status = self.statuses.popitem(last=False)
+        for term in self._status_terms(status):
+            ids = self.terms[term]
+            ids.discard(id)
+            if not ids:
+                del self.terms[term]
+
+    def _status_terms(self, status):
+        return terms(status.text) | set([u'from:' + status.user.screen_name.lower()])
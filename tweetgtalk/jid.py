@@ -0,0 +1,44 @@
+class JID(unicode):
+    '''
+    A JID split in its bare part and resource only once.
+
+    Instances are interned: building a JID from a string already seen
+    returns the same object, so the hot path doesn't allocate and parse
+    again for every stanza. It compares and hashes like the full JID string.
+
+    :param value: full or bare JID, as a string or a sleekxmpp JID. Strings
+                  are looked up without allocating, see ``sender``
+
+    '''
+
+    MAX_INTERNED = 10000
+
+    _interned = {}
+
+    def __new__(cls, value):
+        if isinstance(value, JID):
+            return value
+        if not isinstance(value, basestring):
+            value = unicode(value)
+        try:
+            return cls._interned[value]
+        except KeyError:
+            pass
+
+        jid = unicode.__new__(cls, value)
+        bare, sep, resource = jid.partition(u"/")
+        jid.resource = resource or None
+        jid.bare = JID(bare) if sep else jid
+
+        if len(cls._interned) >= cls.MAX_INTERNED:
+            cls._interned.clear()
+        cls._interned[value] = jid
+        return jid
+
+
+def sender(stanza):
+    '''
+    ``JID`` of who sent ``stanza``, from the raw "from" attribute. Unlike
+    ``stanza.get_from()`` it doesn't build and format a sleekxmpp JID
+    '''
+    return JID(stanza.xml.get('from'))
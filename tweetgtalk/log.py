@@ -0,0 +1,158 @@
+'''
+Structured logging that doesn't block the thread logging.
+
+Records are put in a queue by ``QueueHandler`` and written by a
+background thread, one JSON object per line, to a size rotated file.
+'''
+import hashlib
+import json
+import logging
+import logging.handlers
+import Queue
+import random
+import threading
+
+def jid_hash(simple_jid):
+    '''
+    Identify an user in the logs without writing their JID. Pass the
+    simple JID, like ``JID.bare``
+    '''
+    return hashlib.sha1(simple_jid.encode('utf-8')).hexdigest()[:12]
+
+
+class JSONFormatter(logging.Formatter):
+    '''
+    Format a record as one JSON line. Anything passed in ``extra={'fields': {...}}``
+    is added to it
+    '''
+
+    def format(self, record):
+        data = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data)
+
+
+class SampleFilter(logging.Filter):
+    '''
+    Keep only a fraction of high volume records.
+
+    :param rates: maps a record's ``event`` field to the fraction of
+                  those records to keep. Warnings and errors are always kept
+
+    '''
+
+    def __init__(self, rates):
+        logging.Filter.__init__(self)
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        event = getattr(record, 'fields', {}).get('event')
+        rate = self.rates.get(event, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class QueueHandler(logging.Handler):
+    '''
+    Put records in a queue instead of writing them. When the queue is
+    full the record is dropped and counted in ``dropped``
+    '''
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+        self.dropped = 0
+
+    def prepare(self, record):
+        # render now, args and exc_info may not be safe to use in another thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Queue.Full:
+            self.dropped += 1
+
+
+class QueueListener(object):
+    '''
+    Background thread writing the records from ``queue`` to ``handler``.
+
+    :param source: the ``QueueHandler`` filling ``queue``, the records it
+                   dropped are reported when stopping
+
+    '''
+
+    _stop = object()
+
+    def __init__(self, queue, handler, source=None):
+        self.queue = queue
+        self.handler = handler
+        self.source = source
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.queue.put(self._stop)
+        self._thread.join()
+        self._thread = None
+        if self.source is not None and self.source.dropped:
+            self.handler.handle(self._dropped_record(self.source.dropped))
+        self.handler.close()
+
+    def _dropped_record(self, dropped):
+        record = logging.LogRecord('tweetgtalk.log', logging.WARNING, __file__, 0,
+                u"%d log records dropped, the queue was full", (dropped,), None)
+        record.fields = {'event': 'log_dropped', 'dropped': dropped}
+        return record
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is self._stop:
+                return
+            self.handler.handle(record)
+
+
+def setup(filename, max_bytes=10*1024*1024, backup_count=5, sampling=None,
+          level=logging.INFO, queue_size=10000):
+    '''
+    Send every log record to ``filename`` through a background writer.
+    Returns the started ``QueueListener``, stop it to flush on exit
+    '''
+    queue = Queue.Queue(queue_size)
+
+    writer = logging.handlers.RotatingFileHandler(filename,
+            maxBytes=max_bytes, backupCount=backup_count)
+    writer.setFormatter(JSONFormatter())
+
+    handler = QueueHandler(queue)
+    if sampling:
+        handler.addFilter(SampleFilter(sampling))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+
+    listener = QueueListener(queue, writer, source=handler)
+    listener.start()
+    return listener
@@ -0,0 +1,81 @@
+import threading
+import time
+
+class PresenceTracker(object):
+    '''
+    Keep track of which users are around, by simple JID, so background
+    twitter work is only done for them.
+
+    Work for an user who is away or offline waits until they are back.
+    Only the last job of each kind is kept, so it runs once when they
+    return instead of once for every time it was asked for. Users we never got a
+    presence from are considered active.
+
+    Presence comes for each resource, an user is away only when none of
+    their resources is available.
+
+    :param release_after: seconds offline after which an user is ``idle``
+
+    '''
+
+    AWAY = ('away', 'xa', 'unavailable')
+
+    def __init__(self, release_after=3600, clock=time.time):
+        self.release_after = release_after
+        self.clock = clock
+        self.resources = {}
+        self.away = {}
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def is_active(self, jid):
+        return jid.bare not in self.away
+
+    def update(self, jid, show):
+        '''
+        Record the presence ``show`` of ``jid``, like "available", "away"
+        or "unavailable". Runs the work waiting for them if they are back
+        '''
+        with self._lock:
+            resources = self.resources.setdefault(jid.bare, {})
+            if show == 'unavailable':
+                resources.pop(jid.resource, None)
+            else:
+                resources[jid.resource] = show
+            if not resources:
+                del self.resources[jid.bare]
+
+            if all(state in self.AWAY for state in resources.values()):
+                self.away.setdefault(jid.bare, self.clock())
+                return
+            if self.away.pop(jid.bare, None) is None:
+                return
+            jobs = self.pending.pop(jid.bare, {})
+
+        for func, args in jobs.values():
+            func(*args)
+
+    def defer(self, jid, key, func, *args):
+        '''
+        Call ``func`` now if ``jid`` is active, otherwise when they are
+        back. A job with the same ``key`` already waiting is replaced
+        '''
+        with self._lock:
+            if jid.bare in self.away:
+                self.pending.setdefault(jid.bare, {})[key] = (func, args)
+                return
+        func(*args)
+
+    def idle(self):
+        '''
+        Simple JIDs offline for more than ``release_after`` seconds
+        '''
+        limit = self.clock() - self.release_after
+        with self._lock:
+            return [ jid for jid, since in self.away.items() if since < limit ]
+
+    def forget(self, jid):
+        with self._lock:
+            self.resources.pop(jid.bare, None)
+            self.away.pop(jid.bare, None)
+            self.pending.pop(jid.bare, None)
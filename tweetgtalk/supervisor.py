@@ -0,0 +1,79 @@
+import logging
+import random
+import signal
+import time
+
+logger = logging.getLogger('tweetgtalk.supervisor')
+
+class Supervisor(object):
+    '''
+    Keep the bot connected, reconnecting with jittered exponential backoff.
+
+    A new bot is built by ``create_bot`` for every connection, the state
+    worth keeping (accounts, caches, replies not sent yet) lives in the
+    ``MessageHandler`` it is given, which survives reconnects.
+
+    :param create_bot: callable returning a bot not connected yet
+    :param address: (host, port) to connect to
+    :param max_attempts: give up after this many failures in a row, None
+                         keeps trying forever
+
+    '''
+
+    def __init__(self, create_bot, address, min_delay=1, max_delay=300,
+                 max_attempts=None, sleep=time.sleep):
+        self.create_bot = create_bot
+        self.address = address
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self.stopped = False
+        self.bot = None
+
+    def delay(self, failures):
+        '''
+        Seconds to wait after ``failures`` in a row, somewhere between half
+        and all of the exponential delay so clients don't retry together
+        '''
+        delay = min(self.max_delay, self.min_delay * 2 ** (failures - 1))
+        return random.uniform(delay / 2.0, delay)
+
+    def run(self):
+        failures = 0
+        while not self.stopped:
+            self.bot = self.create_bot()
+            if self.bot.connect(self.address, reattempt=False):
+                logger.info(u"Connected to %s", self.address[0])
+                self.bot.run()
+                if self.bot.killed:
+                    break
+                if self.bot.session_started:
+                    failures = 0
+                logger.warning(u"Disconnected from %s", self.address[0])
+            else:
+                logger.warning(u"Could not connect to %s", self.address[0])
+
+            if self.stopped:
+                break
+            failures += 1
+            if self.max_attempts is not None and failures >= self.max_attempts:
+                logger.error(u"Giving up after %d attempts", failures)
+                break
+            self.sleep(self.delay(failures))
+
+    def stop(self):
+        self.stopped = True
+        if self.bot is not None:
+            self.bot.disconnect()
+
+    def stop_on_signals(self, signals=(signal.SIGTERM, signal.SIGHUP)):
+        '''
+        Stop when the process gets one of ``signals``, "fab stop" sends
+        SIGTERM. Must be called from the main thread
+        '''
+        for signum in signals:
+            signal.signal(signum, self._handle_signal)
+
+    def _handle_signal(self, signum, frame):
+        self.stop()
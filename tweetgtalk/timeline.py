@@ -0,0 +1,157 @@
+import logging
+import threading
+
+logger = logging.getLogger('tweetgtalk.timeline')
+
+class TimelineCursor(object):
+    '''
+    Remember where an user is in the home timeline, using status ids
+    instead of page numbers, so new tweets don't shift the pages.
+
+    The next older slice is fetched in background as soon as a slice is
+    shown, so asking for it usually doesn't wait on twitter.
+
+    :param count: number of statuses in each slice
+    :param defer: called as ``defer(key, func, *args)`` to run background
+                  work, like ``TwitterManager.defer``. Without it nothing
+                  is prefetched
+
+    '''
+
+    # most pages of new statuses fetched at once, the rest are fetched
+    # by the next calls to ``newer``
+    MAX_PAGES = 5
+
+    def __init__(self, count=20, defer=None):
+        self.count = count
+        self.defer = defer
+        self.max_id = None
+        self.since_id = None
+        self._buffer = None
+        self._newer = []
+        # new statuses up to this id are not fetched yet
+        self._gap = None
+        # newest status shown by ``newer``
+        self._newest = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        '''
+        New statuses already fetched and not shown yet
+        '''
+        return len(self._newer)
+
+    @property
+    def truncated(self):
+        '''
+        True when there are new statuses not fetched yet, more than
+        ``MAX_PAGES`` pages of them had arrived
+        '''
+        return self._gap is not None
+
+    def seen(self, api, status_list):
+        '''
+        Move the cursor past ``status_list``, already shown to the user
+        '''
+        if not status_list:
+            return
+        ids = [ status.id for status in status_list ]
+        with self._lock:
+            self.max_id = min(ids) - 1
+            self.since_id = max([self.since_id] + ids)
+            self._buffer = None
+            self._newer = [ status for status in self._newer
+                            if status.id > self.since_id ]
+            if self._gap is not None and self._gap <= self.since_id:
+                self._gap = None
+        self.prefetch(api)
+
+    def older(self, api):
+        if self.max_id is None:
+            status_list = api.home_timeline(count=self.count)
+        else:
+            status_list = self._take_buffer()
+            if status_list is None:
+                status_list = api.home_timeline(max_id=self.max_id, count=self.count)
+        self.seen(api, status_list)
+        return status_list
+
+    def newer(self, api):
+        '''
+        The oldest ``count`` statuses not seen yet, newest first. When
+        more arrived they are kept for the next call, see ``pending``.
+
+        When more than ``MAX_PAGES`` pages arrived only the newest are
+        fetched and shown first, the older are fetched by the next calls,
+        see ``truncated``
+        '''
+        if self.since_id is None:
+            return self.older(api)
+        if not self._newer:
+            self._fetch_newer(api)
+        with self._lock:
+            status_list = self._newer[:self.count]
+            self._newer = self._newer[self.count:]
+            if status_list:
+                self._newest = max(self._newest, status_list[-1].id)
+            # statuses below a gap are not seen yet, since_id waits for it
+            if self._gap is None:
+                if self._newer:
+                    self.since_id = status_list[-1].id
+                else:
+                    self.since_id = max(self.since_id, self._newest)
+        status_list.reverse()
+        return status_list
+
+    def prefetch(self, api):
+        if self.defer is not None:
+            self.defer('prefetch', self._fetch, api, self.max_id)
+
+    def release(self):
+        '''
+        Drop the statuses fetched and not shown yet
+        '''
+        with self._lock:
+            self._buffer = None
+            self._newer = []
+
+    def _fetch_newer(self, api):
+        '''
+        Fetch the statuses newer than ``since_id`` into ``_newer``, oldest
+        first, paging back from the newest, or from the gap left by the
+        last fetch. Stops on an empty page, twitter returns short pages
+        when statuses were deleted, or after ``MAX_PAGES`` pages
+        '''
+        status_list = []
+        max_id = self._gap
+        for i in range(self.MAX_PAGES):
+            page = api.home_timeline(since_id=self.since_id, max_id=max_id,
+                                     count=self.count)
+            if not page:
+                max_id = None
+                break
+            status_list.extend(page)
+            max_id = page[-1].id - 1
+            if max_id <= self.since_id:
+                max_id = None
+                break
+        status_list.reverse()
+        with self._lock:
+            self._newer = status_list
+            self._gap = max_id
+
+    def _fetch(self, api, max_id):
+        try:
+            status_list = api.home_timeline(max_id=max_id, count=self.count)
+        except Exception:
+            logger.exception(u"Timeline prefetch failed")
+            return
+        with self._lock:
+            if max_id == self.max_id:
+                self._buffer = status_list
+
+    def _take_buffer(self):
+        with self._lock:
+            status_list, self._buffer = self._buffer, None
+        return status_list
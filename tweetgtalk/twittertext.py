@@ -0,0 +1,98 @@
+'''
+Tweet text rules, counted the way twitter counts them
+'''
+import re
+import unicodedata
+
+MAX_LENGTH = 140
+
+# every link is wrapped by t.co, whatever its real length
+SHORT_URL_LENGTH = 23
+
+URL_RE = re.compile(r'(?:https?://|www\.)[^\s<>"]+', re.IGNORECASE | re.UNICODE)
+
+# punctuation ending a sentence, not the link before it
+URL_TRAILING = u'.,;:!?)]\'"'
+
+# characters outside the BMP are stored as two code units on narrow builds
+SURROGATE_PAIR_RE = re.compile(u'[\ud800-\udbff][\udc00-\udfff]')
+
+PART_SUFFIX = u' {0}/{1}'
+
+
+def normalize(text):
+    if isinstance(text, str):
+        text = text.decode('utf-8')
+    return unicodedata.normalize('NFC', text.strip())
+
+def _url_spans(text):
+    '''
+    (start, end) of every link in ``text``
+    '''
+    for match in URL_RE.finditer(text):
+        url = match.group().rstrip(URL_TRAILING)
+        yield match.start(), match.start() + len(url)
+
+def _length(text):
+    return len(text) - len(SURROGATE_PAIR_RE.findall(text))
+
+def tweet_length(text):
+    '''
+    Length of an already normalized ``text`` as twitter counts it
+    '''
+    length, position = 0, 0
+    for start, end in _url_spans(text):
+        length += _length(text[position:start]) + SHORT_URL_LENGTH
+        position = end
+    return length + _length(text[position:])
+
+def split_tweet(text, limit=MAX_LENGTH):
+    '''
+    Split ``text`` in parts that fit in a tweet, breaking on spaces.
+    Each part ends with its position, like " 1/3"
+    '''
+    text = normalize(text)
+    if tweet_length(text) <= limit:
+        return [text]
+
+    # the suffix grows with the number of parts, so try until it fits
+    total = 2
+    while True:
+        room = limit - len(PART_SUFFIX.format(total, total))
+        parts = _pack(text.split(), room)
+        if len(parts) <= total:
+            break
+        total = len(parts)
+
+    return [ part + PART_SUFFIX.format(i, len(parts))
+             for i, part in enumerate(parts, 1) ]
+
+def _pack(words, room):
+    parts, current = [], u''
+    for word in words:
+        while tweet_length(word) > room:
+            cut = _cut(word, room)
+            head, word = word[:cut], word[cut:]
+            if current:
+                parts.append(current)
+                current = u''
+            parts.append(head)
+        candidate = current + u' ' + word if current else word
+        if tweet_length(candidate) <= room:
+            current = candidate
+        else:
+            parts.append(current)
+            current = word
+    if current:
+        parts.append(current)
+    return parts
+
+def _cut(word, room):
+    '''
+    Where to cut a ``word`` too long for a part: after ``room``
+    characters, or around the link there so it is not broken
+    '''
+    for start, end in _url_spans(word):
+        if start < room < end:
+            return start or end
+    return room
@@ -0,0 +1,60 @@
+import logging
+import Queue
+import threading
+
+logger = logging.getLogger('tweetgtalk.workers')
+
+class WorkerPool(object):
+    '''
+    Run jobs on a fixed number of threads instead of the XMPP event thread.
+
+    Jobs submitted with the same key always go to the same thread, so
+    messages from one user are still handled in the order they arrived.
+
+    :param size: number of worker threads
+
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.queues = [ Queue.Queue() for i in range(size) ]
+        self.threads = []
+
+    def start(self):
+        for queue in self.queues:
+            thread = threading.Thread(target=self._run, args=(queue,))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, func, *args, **kwargs):
+        queue = self.queues[hash(key) % self.size]
+        queue.put((func, args, kwargs))
+
+    def join(self):
+        '''
+        Block until every submitted job has run
+        '''
+        for queue in self.queues:
+            queue.join()
+
+    def stop(self):
+        for queue in self.queues:
+            queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _run(self, queue):
+        while True:
+            job = queue.get()
+            try:
+                if job is None:
+                    return
+                func, args, kwargs = job
+                try:
+                    func(*args, **kwargs)
+                except Exception:
+                    logger.exception(u"Job failed")
+            finally:
+                queue.task_done()